@@ -1,29 +1,118 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import uvicorn
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+import asyncio
+import functools
 import logging
 import os
-from typing import Optional, Any, Dict, Union
-from rag import get_answer
-from qdrant import create_collection, upload_documents
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, List
+from dotenv import load_dotenv
+
+# Load environment variables once, before any module builds its configuration
+ENV_PATH = os.getenv("ENV_PATH", "/Users/nikolaynechay/Data_Science/RAG/backend/.env")
+load_dotenv(dotenv_path=ENV_PATH)
+
+from config import CONFIG
+from rag import RAGResult, get_answer, stream_answer
+from qdrant import SEARCH_PARAMS, create_collection, query_embeddings, upload_documents, vector_store
+from loader import load_one
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables or set defaults
-TEMPLATE_PATH = os.getenv("TEMPLATE_PATH", "/Users/nikolaynechay/Data_Science/RAG/backend/src/prompt_template.txt")
+_log_listener: Optional[QueueListener] = None
+_log_handlers: List[logging.Handler] = []
+
+def start_queue_logging() -> None:
+    """
+    Hand log records to a background thread so handler I/O never blocks a request.
+    """
+    global _log_listener, _log_handlers
+    if _log_listener is not None:
+        return
 
-if not TEMPLATE_PATH or not os.path.exists(TEMPLATE_PATH):
-    logger.error(f"Invalid TEMPLATE_PATH: {TEMPLATE_PATH}. Please ensure the file exists.")
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    _log_handlers = root_logger.handlers[:]
+    _log_listener = QueueListener(log_queue, *_log_handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    _log_listener.start()
+
+def stop_queue_logging() -> None:
+    """
+    Flush queued log records and restore the original handlers.
+    """
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    logging.getLogger().handlers = _log_handlers
+    _log_listener = None
+
+TEMPLATE_PATH = CONFIG.template_path
+
+# Route of the Server-Sent Events endpoint, which must never be compressed
+STREAM_PATH = "/api/rag/stream"
+
+# Seconds between keep-alive embeddings that stop the OpenAI connection from going cold
+KEEPALIVE_INTERVAL = 30
+
+# Most URLs accepted by one upload request
+MAX_UPLOAD_URLS = 50
+# Threads that fetch, parse and upload documents, kept apart from the default executor used by queries
+UPLOAD_THREADS = 4
+_UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=UPLOAD_THREADS, thread_name_prefix="upload")
+
+# Template paths that have been found on disk at least once
+_KNOWN_TEMPLATES = set()
+
+@functools.lru_cache(maxsize=32)
+def _template_exists(path: str, minute_bucket: int) -> bool:
+    """
+    Check whether a template file exists, cached for the given minute.
+    """
+    return os.path.exists(path)
+
+async def template_exists(path: Optional[str]) -> bool:
+    """
+    Check whether a template file exists without blocking the event loop on unknown paths.
+
+    Known templates are re-checked at most once a minute; unknown paths are probed in a worker thread.
+    """
+    if not path:
+        return False
+    # The default template was loaded at startup and is served from memory
+    if path == CONFIG.template_path and CONFIG.template_text is not None:
+        return True
+    if path in _KNOWN_TEMPLATES:
+        if _template_exists(path, int(time.time() // 60)):
+            return True
+        _KNOWN_TEMPLATES.discard(path)
+        return False
+
+    exists = await asyncio.to_thread(os.path.exists, path)
+    if exists:
+        _KNOWN_TEMPLATES.add(path)
+    return exists
 
 # Initialize FastAPI application
 app = FastAPI(
     title="RAG ChatBot",
     version="1.0.0",
     description="ChatBot API using Retrieve Augmented Generation model",
+    default_response_class=ORJSONResponse,
 )
 
 # Middleware configuration
@@ -35,47 +124,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves the Server-Sent Events stream uncompressed, since gzip would buffer the events.
+    """
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(STREAM_PATH):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compress large responses, preferring brotli when it is installed (it falls back to gzip per client)
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=4,
+        minimum_size=1024,
+        excluded_handlers=[rf"^{STREAM_PATH}"],
+    )
+else:
+    app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1024)
+
 # Pydantic models
 class QueryRequest(BaseModel):
-    question: str
+    model_config = ConfigDict(extra="forbid", frozen=True, str_strip_whitespace=True)
+
+    question: str = Field(min_length=1)
     template_path: Optional[str] = TEMPLATE_PATH
 
+class ContextItem(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    source: str
+    snippet: str
+
 class QueryResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     answer: str
-    context: Union[str, Any] = None
+    context: List[ContextItem] = []
+
 class UploadRequest(BaseModel):
-    url: str
+    model_config = ConfigDict(extra="forbid", frozen=True, str_strip_whitespace=True)
+
+    urls: List[str] = Field(min_length=1, max_length=MAX_UPLOAD_URLS)
     collection_name: str
+
+_keepalive_task: Optional[asyncio.Task] = None
+
+async def _keepalive() -> None:
+    """
+    Periodically embed a tiny string so the pooled OpenAI connection stays warm.
+    """
+    while True:
+        await asyncio.sleep(KEEPALIVE_INTERVAL)
+        try:
+            await query_embeddings.aembed_query("ping")
+        except Exception as e:
+            logger.warning("Keep-alive embedding failed: %s", e)
+
+@app.on_event("startup")
+async def warm_up() -> None:
+    """
+    Start queued logging and open the OpenAI and Qdrant connections before the first request arrives.
+    """
+    global _keepalive_task
+    start_queue_logging()
+
+    try:
+        # Embeds the query through the async OpenAI client and runs one search against Qdrant
+        await vector_store.asimilarity_search("warmup", k=1, search_params=SEARCH_PARAMS)
+        logger.info("Vector store and embeddings warmed up.")
+    except Exception as e:
+        logger.warning("Warm-up failed: %s", e)
+
+    _keepalive_task = asyncio.create_task(_keepalive())
+
+@app.on_event("shutdown")
+async def stop_keepalive() -> None:
+    """
+    Cancel the keep-alive task, stop the upload threads and flush queued logs.
+    """
+    if _keepalive_task is not None:
+        _keepalive_task.cancel()
+    _UPLOAD_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    stop_queue_logging()
+
 # Chatbot endpoint
-@app.post("/api/rag", response_class=JSONResponse, response_model=QueryResponse)
+@app.post("/api/rag", response_model=QueryResponse)
 async def chatbot_endpoint(payload: QueryRequest) -> QueryResponse:
     """
     Endpoint to handle incoming requests and return responses.
     """
     try:
-        logger.info(f"Received RAG query: {payload.question}")
+        logger.info("Received RAG query: %s", payload.question)
 
         # Validate the template path
-        if not payload.template_path or not os.path.exists(payload.template_path):
-            logger.error(f"Template file not found at path: {payload.template_path}")
+        if not await template_exists(payload.template_path):
+            logger.error("Template file not found at path: %s", payload.template_path)
             raise HTTPException(
                 status_code=400, detail=f"Template file not found at path: {payload.template_path}"
             )
 
         # Call the RAG system to get the answer
-        response_data: Dict[str, Any] = get_answer(
+        response_data: RAGResult = await get_answer(
             question=payload.question,
             template_path=payload.template_path,
         )
 
-        answer = response_data.get("answer", "")
-        context = response_data.get("context", "")
+        answer = response_data["answer"]
+        context = response_data["context"]
 
-        logger.info(f"Successfully retrieved answer: {answer}")
+        logger.debug("Successfully retrieved answer of %s characters.", len(answer))
         return QueryResponse(answer=answer, context=context)
 
     except FileNotFoundError as e:
-        logger.error(f"FileNotFoundError: {e}")
+        logger.error("FileNotFoundError: %s", e)
         raise HTTPException(
             status_code=400, detail=f"Template file not found: {e}"
         )
@@ -83,35 +247,63 @@ async def chatbot_endpoint(payload: QueryRequest) -> QueryResponse:
         # Pass HTTP exceptions directly
         raise http_ex
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=500, detail="An unexpected error occurred while processing your request."
         )
 
-@app.post("/api/upload", response_class=JSONResponse)
+# Streaming chatbot endpoint
+@app.get(STREAM_PATH)
+async def chatbot_stream_endpoint(question: str = Query(min_length=1), template_path: Optional[str] = TEMPLATE_PATH) -> StreamingResponse:
+    """
+    Endpoint to stream the answer to a question as Server-Sent Events.
+    """
+    logger.info("Received streaming RAG query: %s", question)
+
+    # Validate the template path
+    if not await template_exists(template_path):
+        logger.error("Template file not found at path: %s", template_path)
+        raise HTTPException(
+            status_code=400, detail=f"Template file not found at path: {template_path}"
+        )
+
+    return StreamingResponse(
+        stream_answer(question=question, template_path=template_path),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+@app.post("/api/upload")
 async def upload_documents_endpoint(payload: UploadRequest):
     """
     Endpoint to handle uploading documents to the Qdrant database.
     """
     try:
-        logger.info(f"Received request to upload documents from URL: {payload.url}")
-        logger.info(f"Collection name: {payload.collection_name}")
+        logger.info("Received request to upload documents from URLs: %s", payload.urls)
+        logger.info("Collection name: %s", payload.collection_name)
+        loop = asyncio.get_running_loop()
 
         # Create collection
-        create_collection(payload.collection_name)
-        logger.info(f"Collection '{payload.collection_name}' created successfully.")
+        await loop.run_in_executor(_UPLOAD_EXECUTOR, create_collection, payload.collection_name)
+        logger.info("Collection '%s' created successfully.", payload.collection_name)
 
-        # Upload documents
-        upload_documents(url=payload.url, collection_name=payload.collection_name)
-        logger.info(f"Documents from '{payload.url}' uploaded successfully.")
+        # Load and split the URLs in parallel on the upload threads, so queries keep the default executor
+        loaded = await asyncio.gather(*[
+            loop.run_in_executor(_UPLOAD_EXECUTOR, load_one, url) for url in payload.urls
+        ])
+        documents = [doc for url_documents in loaded for doc in url_documents]
 
-        return JSONResponse(
-            content={"message": f"Documents from '{payload.url}' uploaded successfully to collection '{payload.collection_name}'."},
-            status_code=200
+        # Upload documents
+        await loop.run_in_executor(
+            _UPLOAD_EXECUTOR,
+            functools.partial(upload_documents, documents=documents, collection_name=payload.collection_name),
         )
+        logger.info("Documents from %s URL(s) uploaded successfully.", len(payload.urls))
+
+        return {"message": f"Documents from {len(payload.urls)} URL(s) uploaded successfully to collection '{payload.collection_name}'."}
 
     except Exception as e:
-        logger.error(f"Error uploading documents: {e}")
+        logger.error("Error uploading documents: %s", e)
         raise HTTPException(
             status_code=500, detail=f"Error uploading documents: {e}"
         )
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent query embeddings into bulk embedding requests.
+
+    Texts submitted within `max_wait` seconds of the first pending text (or until
+    `max_batch_size` texts are queued) are embedded with a single `aembed_documents`
+    call, and each caller receives its own vector.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait: float = 0.015) -> None:
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text as part of the next batch.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            List[float]: The embedding of the text.
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        # The queue and worker belong to one event loop; restart them if the loop changed
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush in the background so the next window starts collecting immediately
+            flush = loop.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            if len(texts) == 1:
+                results: Dict[str, Any] = {texts[0]: e}
+            else:
+                # One bad input must not fail the unrelated queries that shared its window
+                logger.warning("Failed to embed batch of %s queries, embedding them one by one: %s", len(texts), e)
+                outcomes = await asyncio.gather(
+                    *[self.embeddings.aembed_documents([text]) for text in texts],
+                    return_exceptions=True,
+                )
+                results = {
+                    text: outcome if isinstance(outcome, BaseException) else outcome[0]
+                    for text, outcome in zip(texts, outcomes)
+                }
+        else:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Embedded %s queries with %s unique texts in one request.", len(batch), len(texts))
+            results = dict(zip(texts, vectors))
+
+        for text, future in batch:
+            if future.done():
+                continue
+            result = results[text]
+            if isinstance(result, BaseException):
+                logger.error("Failed to embed query: %s", result)
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper whose async query embeddings go through an `EmbeddingBatcher`.
+
+    Synchronous calls and document embeddings are delegated to the wrapped embeddings.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait: float = 0.015) -> None:
+        self.embeddings = embeddings
+        self.batcher = EmbeddingBatcher(embeddings, max_batch_size=max_batch_size, max_wait=max_wait)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.batcher.embed(text)
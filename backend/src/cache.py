@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(question: str, template: str) -> str:
+    """
+    Build the exact-match cache key for a question and prompt template.
+
+    Args:
+        question (str): The question asked by the user.
+        template (str): Identifier of the prompt template version, e.g. its path and modification time.
+
+    Returns:
+        str: A SHA-256 hex digest of the normalized question and template.
+    """
+    normalized = f"{template}|{question.strip().lower()}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of RAG answers with a semantic (embedding) lookup layer.
+
+    Exact hits are served from an OrderedDict keyed by `make_cache_key`. Query
+    embeddings are kept in a single preallocated float32 matrix so a semantic
+    lookup is one matrix-vector product over all cached questions; each slot also
+    records its prompt template so answers are only reused for the same template.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 300.0,
+        dim: int = 1536,
+        similarity_threshold: float = 0.97,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.dim = dim
+        self.similarity_threshold = similarity_threshold
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        # key -> (inserted_at, value, vector slot or -1)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self._vectors = np.zeros((max_size, dim), dtype=np.float32)
+        self._slot_keys: List[Optional[str]] = [None] * max_size
+        # Template of each slot as a small integer id, -1 for free slots
+        self._slot_templates = np.full(max_size, -1, dtype=np.int32)
+        # Insertion time of each slot, so expired entries are skipped by semantic lookups
+        self._slot_inserted_at = np.zeros(max_size, dtype=np.float64)
+        self._template_ids: Dict[str, int] = {}
+        self._free_slots: List[int] = list(range(max_size - 1, -1, -1))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _expired(self, inserted_at: float) -> bool:
+        return time.monotonic() - inserted_at > self.ttl
+
+    def _remove(self, key: str) -> None:
+        _, _, slot = self._entries.pop(key)
+        if slot >= 0:
+            self._vectors[slot] = 0.0
+            self._slot_keys[slot] = None
+            self._slot_templates[slot] = -1
+            self._free_slots.append(slot)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer by its exact key.
+
+        Args:
+            key (str): Key produced by `make_cache_key`.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached result, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    self._remove(key)
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_similar(self, embedding: Sequence[float], template: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a live cached answer for the same template whose question embedding is close to the given one.
+
+        Args:
+            embedding (Sequence[float]): Embedding of the incoming question.
+            template (str): Template version the answer must have been generated with.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached result if the best cosine similarity
+            exceeds the threshold, otherwise None.
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            template_id = self._template_ids.get(template)
+            if not self._entries or template_id is None:
+                return None
+
+            # Slots of other templates and expired slots can never match
+            scores = self._vectors @ query
+            stale = time.monotonic() - self._slot_inserted_at > self.ttl
+            scores[(self._slot_templates != template_id) | stale] = -np.inf
+            slot = int(np.argmax(scores))
+            key = self._slot_keys[slot]
+            if key is None or scores[slot] <= self.similarity_threshold:
+                return None
+
+            _, value, _ = self._entries[key]
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            logger.debug("Semantic cache hit with similarity %.4f", scores[slot])
+            return value
+
+    def put(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        embedding: Optional[Sequence[float]] = None,
+        template: str = "",
+    ) -> None:
+        """
+        Insert a result into the cache, evicting the least recently used entry if full.
+
+        Args:
+            key (str): Key produced by `make_cache_key`.
+            value (Dict[str, Any]): The result to cache.
+            embedding (Optional[Sequence[float]]): Embedding of the question, enabling semantic hits.
+            template (str): Template version the answer was generated with.
+
+        Returns:
+            None
+        """
+        inserted_at = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_size:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+            slot = -1
+            if embedding is not None:
+                slot = self._free_slots.pop()
+                self._vectors[slot] = self._normalize(embedding)
+                self._slot_keys[slot] = key
+                self._slot_templates[slot] = self._template_ids.setdefault(template, len(self._template_ids))
+                self._slot_inserted_at[slot] = inserted_at
+
+            self._entries[key] = (inserted_at, value, slot)
+
+    def clear(self) -> None:
+        """
+        Drop every cached entry, e.g. after the underlying collection has changed.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._vectors[:] = 0.0
+            self._slot_keys = [None] * self.max_size
+            self._slot_templates[:] = -1
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
+        logger.info("Query cache cleared.")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the cache counters.
+
+        Returns:
+            Dict[str, int]: Size, hits, semantic hits, misses and evictions.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _normalize(self, embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+query_cache = QueryCache()
@@ -0,0 +1,67 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_PATH = "/Users/nikolaynechay/Data_Science/RAG/backend/src/prompt_template.txt"
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """
+    Settings read from the environment once at startup.
+
+    Attributes:
+        openai_api_key (Optional[str]): API key for OpenAI.
+        qdrant_api_key (str): API key for Qdrant.
+        qdrant_endpoint (str): URL of the Qdrant instance.
+        qdrant_use_grpc (bool): Whether to talk to Qdrant over gRPC instead of REST.
+        template_path (str): Path to the default prompt template.
+        template_text (Optional[str]): Contents of the default prompt template, or None if it could not be read.
+    """
+    openai_api_key: Optional[str]
+    qdrant_api_key: str
+    qdrant_endpoint: str
+    qdrant_use_grpc: bool
+    template_path: str
+    template_text: Optional[str]
+
+def load_config() -> Config:
+    """
+    Read and validate the settings from the environment and load the default prompt template.
+
+    Returns:
+        Config: The validated settings.
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    qdrant_endpoint = os.getenv("QDRANT_ENDPOINT")
+    # gRPC is the default transport; set QDRANT_USE_GRPC=0 to fall back to REST
+    qdrant_use_grpc = os.getenv("QDRANT_USE_GRPC", "1") == "1"
+    template_path = os.getenv("TEMPLATE_PATH", DEFAULT_TEMPLATE_PATH)
+
+    if not qdrant_api_key or not qdrant_endpoint:
+        raise ValueError("Environment variables QDRANT_API_KEY and QDRANT_ENDPOINT must be set.")
+    if not openai_api_key:
+        logger.error("OPENAI_API_KEY is not set. Please check your .env file.")
+
+    template_text = None
+    try:
+        with open(template_path, "r") as file:
+            template_text = file.read()
+    except OSError as e:
+        logger.error("Invalid TEMPLATE_PATH: %s. Please ensure the file exists. (%s)", template_path, e)
+
+    return Config(
+        openai_api_key=openai_api_key,
+        qdrant_api_key=qdrant_api_key,
+        qdrant_endpoint=qdrant_endpoint,
+        qdrant_use_grpc=qdrant_use_grpc,
+        template_path=template_path,
+        template_text=template_text,
+    )
+
+CONFIG = load_config()
@@ -0,0 +1,98 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pages larger than this are parsed and split in a worker process
+HEAVY_PAGE_BYTES = 100 * 1024
+# Parser processes per API worker; kept small because every uvicorn worker has its own pool
+PARSER_PROCESSES = 2
+
+# Configure text splitter, measuring chunks in embedding-model tokens
+text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+    encoding_name="cl100k_base",
+    chunk_size=500,
+    chunk_overlap=50,
+)
+
+# Shared HTTP session for fetching pages
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "Mozilla/5.0 (compatible; RAG-Uploader/1.0)"})
+
+# Parsing and splitting are CPU-bound, so heavy pages bypass the GIL in separate processes
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_PROCESS_POOL_LOCK = threading.Lock()
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the parser process pool, creating it on first use.
+
+    Workers are spawned rather than forked, because the API process already
+    runs threads and gRPC channels that are unsafe to fork. A spawned worker
+    re-imports the parent's `__main__` module and then only this one, so it
+    stays free of the Qdrant and OpenAI clients when the server is started
+    through `serve.py` or the uvicorn/gunicorn command line, but not when
+    `qdrant.py` is run as a script.
+    """
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None:
+            _PROCESS_POOL = ProcessPoolExecutor(
+                max_workers=PARSER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _PROCESS_POOL
+
+def split_html(url: str, html: bytes, encoding: Optional[str] = None) -> List[Document]:
+    """
+    Parse an HTML page and split its text into chunks.
+
+    Args:
+        url (str): The URL the page was loaded from.
+        html (bytes): The raw HTML of the page.
+        encoding (Optional[str]): The charset declared by the server, if any; otherwise
+            BeautifulSoup detects it from the meta tags or the content.
+
+    Returns:
+        List[Document]: The chunks, with the page URL in their metadata.
+    """
+    soup = BeautifulSoup(html, "lxml", from_encoding=encoding)
+
+    metadata = {"source": url, "source_url": url}
+    title = soup.find("title")
+    if title:
+        metadata["title"] = title.get_text()
+
+    return text_splitter.split_documents([Document(page_content=soup.get_text(), metadata=metadata)])
+
+def load_one(url: str) -> List[Document]:
+    """
+    Load a web page and split it into chunks.
+
+    Args:
+        url (str): The URL of the web resource to load.
+
+    Returns:
+        List[Document]: The chunks of the page.
+    """
+    logger.info("Loading documents from URL: %s", url)
+    response = _SESSION.get(url, timeout=30)
+    response.raise_for_status()
+    html = response.content
+
+    # Only trust an explicit charset; requests falls back to ISO-8859-1 for text/html without one
+    encoding = response.encoding if "charset" in response.headers.get("Content-Type", "").lower() else None
+
+    if len(html) > HEAVY_PAGE_BYTES:
+        return _get_process_pool().submit(split_html, url, html, encoding).result()
+    return split_html(url, html, encoding)
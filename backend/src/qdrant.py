@@ -1,57 +1,122 @@
-import os
+import uuid
 import logging
-from dotenv import load_dotenv
-from typing import Optional
+import httpx
+from typing import List, Literal, Optional
+from langchain_core.documents import Document
 from langchain_qdrant import Qdrant
 from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import WebBaseLoader
-from qdrant_client import QdrantClient, models
-from bs4 import BeautifulSoup
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+from batching import BatchedEmbeddings
+from cache import query_cache
+from config import CONFIG
+from loader import load_one
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-ENV_PATH = "/Users/nikolaynechay/Data_Science/RAG/backend/.env"  
-load_dotenv(dotenv_path=ENV_PATH)
-
-# Load environment variables
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT")
 COLLECTION_NAME = "Wiki_2"
 
-# Validate environment variables
-if not QDRANT_API_KEY or not QDRANT_ENDPOINT:
-    raise ValueError("Environment variables QDRANT_API_KEY and QDRANT_ENDPOINT must be set.")
+# OpenAI accepts at most 2048 inputs per embedding request
+EMBEDDING_BATCH_SIZE = 2048
+UPSERT_BATCH_SIZE = 256
 
 # Initialize Qdrant client and vector store
 client = QdrantClient(
-    url=QDRANT_ENDPOINT,
-    api_key=QDRANT_API_KEY,
+    url=CONFIG.qdrant_endpoint,
+    api_key=CONFIG.qdrant_api_key,
+    prefer_grpc=CONFIG.qdrant_use_grpc,
+    timeout=10,
+)
+
+# Async client, so searches from the API run as async I/O instead of in the default thread pool
+async_client = AsyncQdrantClient(
+    url=CONFIG.qdrant_endpoint,
+    api_key=CONFIG.qdrant_api_key,
+    prefer_grpc=CONFIG.qdrant_use_grpc,
+    timeout=10,
+)
+
+# Embeddings shared by uploads and queries, with pooled connections to OpenAI (HTTP/2 when h2 is installed)
+_EMBEDDINGS = OpenAIEmbeddings(
+    api_key=CONFIG.openai_api_key,
+    chunk_size=EMBEDDING_BATCH_SIZE,
+    http_client=httpx.Client(
+        timeout=60,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+    ),
+    http_async_client=httpx.AsyncClient(
+        timeout=60,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+    ),
 )
 
+# Concurrent async query embeddings are coalesced into bulk requests
+query_embeddings = BatchedEmbeddings(_EMBEDDINGS)
+
 vector_store = Qdrant(
     client=client,
     collection_name=COLLECTION_NAME,
-    embeddings=OpenAIEmbeddings(),
+    embeddings=query_embeddings,
+    async_client=async_client,
 )
 
-# Configure text splitter
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=20,
-    length_function=len,
+# Search over quantized vectors, then rescore the oversampled candidates with full-precision vectors
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(
+        ignore=False,
+        rescore=True,
+        oversampling=2.0,
+    ),
 )
 
-def create_collection(collection_name: str, vector_size: int = 1536) -> None:
+def _quantization_config(quantization: Literal["none", "int8", "binary"]) -> Optional[models.QuantizationConfig]:
+    """
+    Build the Qdrant quantization config for the given quantization mode.
+
+    Args:
+        quantization (str): One of "none", "int8" or "binary".
+
+    Returns:
+        Optional[models.QuantizationConfig]: The quantization config, or None for full-precision vectors.
+    """
+    if quantization == "none":
+        return None
+    if quantization == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            ),
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True),
+        )
+    raise ValueError(f"Unsupported quantization '{quantization}'. Expected 'none', 'int8' or 'binary'.")
+
+def create_collection(
+    collection_name: str,
+    vector_size: int = 1536,
+    quantization: Literal["none", "int8", "binary"] = "int8",
+) -> None:
     """
     Create a new collection in the Qdrant database.
 
     Args:
         collection_name (str): The name of the collection to be created.
         vector_size (int): The size of the vectors. Default is 1536.
+        quantization (str): Vector quantization, one of "none", "int8" or "binary". Default is "int8".
 
     Returns:
         None
@@ -63,47 +128,62 @@ def create_collection(collection_name: str, vector_size: int = 1536) -> None:
                 size=vector_size,
                 distance=models.Distance.COSINE,
             ),
+            hnsw_config=models.HnswConfigDiff(
+                m=16,
+                ef_construct=128,
+            ),
+            quantization_config=_quantization_config(quantization),
         )
-        logger.info(f"Collection '{collection_name}' created successfully!")
+        logger.info("Collection '%s' created successfully!", collection_name)
     except Exception as e:
-        logger.error(f"Failed to create collection '{collection_name}': {e}")
+        logger.error("Failed to create collection '%s': %s", collection_name, e)
         raise
 
-def upload_documents(url: str, collection_name: str) -> None:
+def upload_documents(documents: List[Document], collection_name: str) -> None:
     """
-    Load documents from a URL, split them into chunks, and upload them to a specified Qdrant collection.
+    Embed document chunks and upload them to a specified Qdrant collection.
 
     Args:
-        url (str): The URL of the web resource to load.
+        documents (List[Document]): The chunks to upload, as returned by `loader.load_one`.
         collection_name (str): The name of the collection to upload to.
 
     Returns:
         None
     """
     try:
-        # Reinitialize vector_store for the specified collection
-        dynamic_vector_store = Qdrant(
-            client=client,
-            collection_name=collection_name,
-            embeddings=OpenAIEmbeddings(),
-        )
-
-        # Load and split the documents
-        logger.info(f"Loading documents from URL: {url}")
-        loader = WebBaseLoader(url)
-        documents = loader.load_and_split(text_splitter)
-
-        # Add metadata to documents
-        for doc in documents:
-            doc.metadata["source_url"] = url
+        # Embed all chunks in bulk requests
+        texts = [doc.page_content for doc in documents]
+        embeddings = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            embeddings.extend(_EMBEDDINGS.embed_documents(texts[start:start + EMBEDDING_BATCH_SIZE]))
+
+        # Use the same payload layout as the langchain Qdrant store so retrieval can read it
+        points = [
+            models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={"page_content": doc.page_content, "metadata": doc.metadata},
+            )
+            for doc, vector in zip(documents, embeddings)
+        ]
 
         # Add documents to Qdrant
-        logger.info(f"Uploading {len(documents)} documents to collection '{collection_name}'...")
-        dynamic_vector_store.add_documents(documents)
-        logger.info(f"Documents from URL '{url}' uploaded successfully!")
+        logger.info("Uploading %s documents to collection '%s'...", len(documents), collection_name)
+        # Updates are applied in order, so waiting on the last batch means every batch is indexed
+        for start in range(0, len(points), UPSERT_BATCH_SIZE):
+            client.upsert(
+                collection_name=collection_name,
+                points=points[start:start + UPSERT_BATCH_SIZE],
+                wait=start + UPSERT_BATCH_SIZE >= len(points),
+            )
+
+        # Only the collection queries are served from can have stale cached answers
+        if collection_name == COLLECTION_NAME:
+            query_cache.clear()
+        logger.info("Documents uploaded to collection '%s' successfully!", collection_name)
 
     except Exception as e:
-        logger.exception(f"Error uploading documents from URL '{url}': {e}")
+        logger.exception("Error uploading documents to collection '%s': %s", collection_name, e)
         raise
 
 if __name__ == "__main__":
@@ -111,8 +191,9 @@ if __name__ == "__main__":
         logger.info("Starting Qdrant operations...")
         collection_name_var = "Wiki_12"
         create_collection(collection_name=collection_name_var)
-        upload_documents(url="https://en.wikipedia.org/wiki/Main_Page", collection_name=collection_name_var)  # Replace with your URL
+        documents = load_one("https://en.wikipedia.org/wiki/Main_Page")  # Replace with your URL
+        upload_documents(documents=documents, collection_name=collection_name_var)
         logger.info("All operations completed successfully.")
     except Exception as e:
-        logger.critical(f"Application failed: {e}")
+        logger.critical("Application failed: %s", e)
         exit(1)
\ No newline at end of file
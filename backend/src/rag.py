@@ -1,145 +1,314 @@
 import os
+import json
+import asyncio
+import functools
 import logging
-from dotenv import load_dotenv
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypedDict
+from langchain_core.documents import Document
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts.chat import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-from operator import itemgetter
 
-from qdrant import vector_store
+from cache import make_cache_key, query_cache
+from config import CONFIG
+from qdrant import SEARCH_PARAMS, query_embeddings, vector_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-ENV_PATH = '/Users/nikolaynechay/Data_Science/RAG/backend/.env'
-if not os.path.exists(ENV_PATH):
-    logger.error(f"Environment file not found at {ENV_PATH}")
-else:
-    load_dotenv(dotenv_path=ENV_PATH)
-    logger.info("Environment variables loaded successfully.")
-
-# Retrieve environment variables
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-QDRANT_API_KEY = os.getenv('QDRANT_API_KEY')
-QDRANT_ENDPOINT = os.getenv('QDRANT_ENDPOINT')
-
-if not OPENAI_API_KEY:
-    logger.error("OPENAI_API_KEY is not set. Please check your .env file.")
-if not QDRANT_API_KEY:
-    logger.warning("QDRANT_API_KEY is not set. Some functionalities may not work.")
-if not QDRANT_ENDPOINT:
-    logger.warning("QDRANT_ENDPOINT is not set. Vector store connection may fail.")
-
 # Initialize the LLM
 try:
     LLM = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
+        api_key=CONFIG.openai_api_key,
         model='gpt-4o',
         temperature=0
     )
     logger.info("ChatOpenAI model initialized.")
 except Exception as e:
-    logger.error(f"Failed to initialize ChatOpenAI model: {e}")
+    logger.error("Failed to initialize ChatOpenAI model: %s", e)
     raise
 
-def load_prompt_template(template_path: str, question: str) -> str:
+# Result types returned by get_answer
+class ContextEntry(TypedDict):
+    source: str
+    snippet: str
+
+class RAGResult(TypedDict):
+    answer: str
+    context: List[ContextEntry]
+
+# Number of characters of each retrieved document returned to clients
+SNIPPET_LENGTH = 200
+
+# Number of documents retrieved per question
+TOP_K = 4
+
+def _compile_prompt(template: str) -> ChatPromptTemplate:
     """
-    Load a prompt template from a file and format it with the given context and question.
+    Compile a prompt template, leaving `{question}` as a prompt variable so the
+    compiled prompt is reused across questions.
+
+    Args:
+        template (str): The template text.
+
+    Returns:
+        ChatPromptTemplate: The compiled prompt.
+    """
+    formatted_prompt = ChatPromptTemplate.from_template(template)
+    logger.info("Initial prompt created successfully.")
+    return formatted_prompt
+
+def _compile_chain(formatted_prompt: ChatPromptTemplate):
+    """
+    Build a chat chain around a compiled prompt.
+
+    The chain takes the question and the retrieved documents as
+    `{'question': ..., 'context': ...}` and returns the LLM message.
+
+    Args:
+        formatted_prompt (ChatPromptTemplate): The compiled prompt.
+
+    Returns:
+        Callable: A chain for processing the input.
+    """
+    chain = formatted_prompt | LLM
+    logger.info("Chat chain created successfully.")
+    return chain
+
+def _read_prompt(template_path: str) -> ChatPromptTemplate:
+    """
+    Load and compile a prompt template from a file.
 
     Args:
         template_path (str): Path to the template file.
-        question (str): Question to be included in the prompt.
 
     Returns:
-        str: Formatted prompt.
+        ChatPromptTemplate: The compiled prompt.
     """
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template file not found at {template_path}")
-    
     try:
         with open(template_path, 'r') as file:
             template = file.read()
-        
-        formatted_prompt = template.format(question=question)
-        logger.info("Prompt template loaded and formatted successfully.")
-        return formatted_prompt
+        return _compile_prompt(template)
     except Exception as e:
-        logger.error(f"Failed to load prompt template: {e}")
+        logger.error("Failed to load prompt template: %s", e)
         raise
 
-def create_chain(template_path: str, question: str):
+@functools.lru_cache(maxsize=16)
+def _get_chain(template_path: str, mtime: float):
     """
-    Create a chat chain from a template file.
+    Build a chat chain from a template file, cached per template path and modification time.
 
     Args:
         template_path (str): Path to the template file.
-        context (str): Context to be included in the chain.
-        question (str): Question to be included in the chain.
+        mtime (float): Modification time of the template file, used to invalidate the cache.
 
     Returns:
         Callable: A chain for processing the input.
     """
     try:
-        template_prompt = load_prompt_template(template_path, question)
-        formatted_prompt = ChatPromptTemplate.from_template(template_prompt)
+        return _compile_chain(_read_prompt(template_path))
+    except Exception as e:
+        logger.error("Failed to create chat chain: %s", e)
+        raise
 
-        logger.info("Initial prompt created successfully.")
+# The default template was read once at startup, so requests using it touch no files
+if CONFIG.template_text is not None:
+    DEFAULT_CHAIN = _compile_chain(_compile_prompt(CONFIG.template_text))
+else:
+    DEFAULT_CHAIN = None
 
-        retriever = vector_store.as_retriever()
-        retriever_with_config = retriever.with_config(top_k=4)
+def _is_default_template(template_path: str) -> bool:
+    return DEFAULT_CHAIN is not None and template_path == CONFIG.template_path
 
-        chain_response = RunnableParallel(
-            {
-                'response': formatted_prompt | LLM,
-                'context': itemgetter('context')
-            }
-        )
+async def _template_mtime(template_path: str) -> Optional[float]:
+    """
+    Return the modification time of a template file, stat-ed off the event loop.
+
+    Args:
+        template_path (str): Path to the template file.
 
-        chain = {
-            'context': retriever_with_config,
-            'question': RunnablePassthrough()
-        } | chain_response
+    Returns:
+        Optional[float]: The modification time, or None for the default template served from memory.
+    """
+    if _is_default_template(template_path):
+        return None
+    return await asyncio.to_thread(os.path.getmtime, template_path)
 
-        logger.info("Chat chain created successfully.")
-        return chain
-    except Exception as e:
-        logger.error(f"Failed to create chat chain: {e}")
-        raise
+def _template_key(template_path: str, mtime: Optional[float]) -> str:
+    """
+    Identify a template version, so cached answers of an edited template are not served.
 
-def get_answer(question: str, template_path: str) -> dict:
+    Args:
+        template_path (str): Path to the template file.
+        mtime (Optional[float]): Modification time of the template file, None for the default template.
+
+    Returns:
+        str: The template path, suffixed with its modification time when it has one.
+    """
+    return template_path if mtime is None else f"{template_path}@{mtime}"
+
+async def _resolve_chain(template_path: str, mtime: Optional[float]):
+    """
+    Return the chain for a template version, using the startup-compiled chain for the default template.
+
+    Other templates are read and compiled off the event loop on a chain cache miss.
+
+    Args:
+        template_path (str): Path to the template file.
+        mtime (Optional[float]): Modification time returned by `_template_mtime`.
+
+    Returns:
+        Callable: A chain for processing the input.
+    """
+    if mtime is None:
+        return DEFAULT_CHAIN
+    return await asyncio.to_thread(_get_chain, template_path, mtime)
+
+async def _retrieve(question_embedding: List[float]) -> List[Document]:
+    """
+    Retrieve the documents closest to an already embedded question.
+
+    Args:
+        question_embedding (List[float]): Embedding of the question.
+
+    Returns:
+        List[Document]: The retrieved documents.
+    """
+    return await vector_store.asimilarity_search_by_vector(
+        question_embedding,
+        k=TOP_K,
+        search_params=SEARCH_PARAMS,
+    )
+
+async def _lookup_cache(question: str, template: str) -> Tuple[str, List[float], Optional[RAGResult]]:
+    """
+    Look up a question in the exact and semantic query caches.
+
+    Args:
+        question (str): The question to be answered.
+        template (str): Template version returned by `_template_key`.
+
+    Returns:
+        Tuple[str, List[float], Optional[RAGResult]]: The cache key, the question embedding
+        (empty on an exact hit) and the cached result, or None on a miss.
+    """
+    cache_key = make_cache_key(question, template)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Answer served from query cache.")
+        return cache_key, [], cached
+
+    question_embedding = await query_embeddings.aembed_query(question)
+    cached = query_cache.get_similar(question_embedding, template)
+    if cached is not None:
+        logger.info("Answer served from semantic query cache.")
+    return cache_key, question_embedding, cached
+
+def _serialize_context(documents: List[Document]) -> List[ContextEntry]:
+    """
+    Reduce retrieved documents to their source URL and a short snippet.
+
+    Args:
+        documents (List[Document]): The retrieved documents.
+
+    Returns:
+        List[ContextEntry]: The source URL and the first characters of each document.
+    """
+    return [
+        {'source': doc.metadata.get('source_url') or '', 'snippet': doc.page_content[:SNIPPET_LENGTH]}
+        for doc in documents
+    ]
+
+def _sse_event(data: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+async def get_answer(question: str, template_path: str) -> RAGResult:
     """
     Get an answer to a question using the specified template and context.
 
     Args:
         question (str): The question to be answered.
         template_path (str): Path to the prompt template.
-        context (str): Additional context for the question.
 
     Returns:
-        dict: A dictionary containing the answer and context.
+        RAGResult: A dictionary containing the answer and the source and snippet of each retrieved document.
     """
     try:
-        chain = create_chain(template_path, question)
-        response = chain.invoke(question)
+        mtime = await _template_mtime(template_path)
+        template = _template_key(template_path, mtime)
+        cache_key, question_embedding, cached = await _lookup_cache(question, template)
+        if cached is not None:
+            return cached
+
+        # Retrieval reuses the embedding computed for the cache lookup
+        chain, documents = await asyncio.gather(
+            _resolve_chain(template_path, mtime),
+            _retrieve(question_embedding),
+        )
+        response = await chain.ainvoke({'context': documents, 'question': question})
+
+        answer = response.content
+        retrieved_context = _serialize_context(documents)
 
-        # answer = response['response'].content
-        answer = response['response'].content
-        retrieved_context = response['context']
+        result: RAGResult = {'answer': answer, 'context': retrieved_context}
+        query_cache.put(cache_key, result, question_embedding, template)
 
         logger.info("Answer retrieved successfully.")
-        return {'answer': answer, 'context': retrieved_context}
+        return result
     except Exception as e:
-        logger.error(f"Failed to retrieve answer: {e}")
+        logger.error("Failed to retrieve answer: %s", e)
         raise
 
+async def stream_answer(question: str, template_path: str) -> AsyncIterator[str]:
+    """
+    Stream an answer to a question as Server-Sent Events.
+
+    The first event carries the retrieved context, sent before the LLM is invoked;
+    every following event carries a `delta` with the next chunk of the answer.
+    Failures are reported as a final `error` event.
+
+    Args:
+        question (str): The question to be answered.
+        template_path (str): Path to the prompt template.
+
+    Yields:
+        str: Server-Sent Event lines.
+    """
+    try:
+        mtime = await _template_mtime(template_path)
+        template = _template_key(template_path, mtime)
+        cache_key, question_embedding, cached = await _lookup_cache(question, template)
+        if cached is not None:
+            yield _sse_event({'context': cached['context']})
+            yield _sse_event({'delta': cached['answer']})
+            return
+
+        # Retrieval reuses the embedding computed for the cache lookup
+        chain, documents = await asyncio.gather(
+            _resolve_chain(template_path, mtime),
+            _retrieve(question_embedding),
+        )
+        serialized_context = _serialize_context(documents)
+        yield _sse_event({'context': serialized_context})
+
+        chunks = []
+        async for chunk in chain.astream({'context': documents, 'question': question}):
+            chunks.append(chunk.content)
+            yield _sse_event({'delta': chunk.content})
+
+        result: RAGResult = {'answer': ''.join(chunks), 'context': serialized_context}
+        query_cache.put(cache_key, result, question_embedding, template)
+        logger.info("Answer streamed successfully.")
+    except Exception as e:
+        logger.error("Failed to stream answer: %s", e)
+        yield _sse_event({'error': 'An unexpected error occurred while processing your request.'})
+
 if __name__ == "__main__":
     try:
-        response = get_answer(
+        response = asyncio.run(get_answer(
             question="Which 9 states that tax Social Security benefits in 2025 in USA?",
-            template_path="/Users/nikolaynechay/Data_Science/RAG/backend/src/prompt_template.txt",
-        )
+            template_path=CONFIG.template_path,
+        ))
         print(response)
     except Exception as e:
-        logger.error(f"Error during main execution: {e}")
+        logger.error("Error during main execution: %s", e)
@@ -0,0 +1,19 @@
+import os
+
+import uvicorn
+
+# Launcher kept apart from app.py: uvicorn workers and spawned parser processes re-import
+# the __main__ module, and this one loads no clients, caches or templates.
+# Equivalent command: uvicorn app:app --host 0.0.0.0 --port 8000 --workers N --loop uvloop --http httptools
+# In production, run under gunicorn instead: gunicorn -k uvicorn.workers.UvicornWorker app:app
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=(os.cpu_count() or 1) * 2 + 1,
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+    )
@@ -1,7 +1,10 @@
 import streamlit as st
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
+import json
 import requests
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from qdrant_client import QdrantClient
 from dotenv import load_dotenv
 
@@ -11,7 +14,7 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_ENDPOINT = os.getenv("QDRANT_ENDPOINT")
 
 # Routers
-CHATING_URL = 'http://localhost:8000/api/rag'
+STREAMING_URL = 'http://localhost:8000/api/rag/stream'
 UPLOAD_URL = 'http://localhost:8000/api/upload'
 DEFAULT_TEMPLATE_PATH = "/Users/nikolaynechay/Data_Science/RAG/backend/src/prompt_template.txt"
 
@@ -23,40 +26,66 @@ st.set_page_config(
     initial_sidebar_state='auto'
 )
 
+# Shared HTTP session so backend connections are pooled and kept alive
+SESSION = requests.Session()
+SESSION.headers.update({'Connection': 'keep-alive'})
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504]
+    )
+)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
 client = QdrantClient(
     url=QDRANT_ENDPOINT, 
     api_key=QDRANT_API_KEY
 )
 
-def query_backend(question: str, template_path: str = DEFAULT_TEMPLATE_PATH):
+def stream_backend(question: str, template_path: str = DEFAULT_TEMPLATE_PATH) -> Iterator[Dict]:
     """
-    Sends a query to the FastAPI backend and returns the response.
+    Streams the answer to a query from the FastAPI backend, yielding each Server-Sent Event.
+    The first event holds the retrieved context; the following events hold answer deltas.
     """
     try:
-        payload = {
+        params = {
             'question': question,
             'template_path': template_path
         }
-        response = requests.post(CHATING_URL, json=payload, timeout=10)
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {'error': f'Error {response.status_code}: {response.text}'}
+        # Ask for an uncompressed stream so compression middleware does not buffer the events
+        with SESSION.get(
+            STREAMING_URL,
+            params=params,
+            headers={'Accept-Encoding': 'identity'},
+            stream=True,
+            timeout=10
+        ) as response:
+            if response.status_code != 200:
+                yield {'error': f'Error {response.status_code}: {response.text}'}
+                return
+
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith('data: '):
+                    yield json.loads(line[len('data: '):])
     except requests.exceptions.RequestException as e:
-        return {'error': f"Connection error: {str(e)}"}
+        yield {'error': f"Connection error: {str(e)}"}
 
-def upload_documents(url: str, collection_name: Optional[str]) -> Dict:
+def upload_documents(urls: List[str], collection_name: Optional[str]) -> Dict:
     """
-    Sends a URL to the FastAPI backend for document uploading.
+    Sends URLs to the FastAPI backend for document uploading.
     """
     try:
         payload = {
-            'url': url,
+            'urls': urls,
             'collection_name': collection_name
         }
 
-        response = requests.post(
+        response = SESSION.post(
             url=UPLOAD_URL,
             json=payload,
             timeout=10
@@ -118,33 +147,47 @@ def main():
 
         if submit_button:
             if question.strip():
+                events = stream_backend(
+                    question=question,
+                    template_path=template_path
+                )
                 with st.spinner('🤖 Chatbot is thinking...'):
-                    response = query_backend(
-                        question=question,
-                        template_path=template_path
-                    )
+                    first_event = next(events, {'error': 'The backend returned an empty response.'})
 
-                    if response.get('error'):
-                        st.error(f"An error occurred: {response['error']}")
+                if first_event.get('error'):
+                    st.error(f"An error occurred: {first_event['error']}")
+                else:
+                    errors = []
+
+                    def answer_deltas() -> Iterator[str]:
+                        for event in events:
+                            if event.get('error'):
+                                errors.append(event['error'])
+                                return
+                            yield event.get('delta', '')
+
+                    st.subheader('*Answer:*')
+                    st.write_stream(answer_deltas())
+
+                    if errors:
+                        st.error(f"An error occurred: {errors[0]}")
                     else:
                         st.success('Answer retrieved successfully!', icon='✅')
-                        st.subheader('*Answer:*')
-                        st.write(response.get('answer', 'No answer found.'))
-
-                        st.subheader('*Context:*')
-                        context = response.get('context', 'No context found.')
-                        if isinstance(context, str):
-                            st.write(context)
-                        else:
-                            st.json(context)
+
+                    st.subheader('*Context:*')
+                    context = first_event.get('context') or 'No context found.'
+                    if isinstance(context, str):
+                        st.write(context)
+                    else:
+                        st.json(context)
             else:
                 st.warning('Please enter a question to continue.')
 
     # Document uploader tab
     with tab2:
         st.subheader('Document Uploader')
-        upload_url = st.text_input(
-            '🔗 Enter the URL for data upload:', help='Provide the URL of the web resource to upload to the Qdrant database.'
+        upload_urls = st.text_area(
+            '🔗 Enter the URLs for data upload (one per line):', help='Provide the URLs of the web resources to upload to the Qdrant database.'
         )
         upload_collection_name = st.text_input(
             '📁 Collection Name:', help='Provide the name of the collection to store the uploaded documents.'
@@ -152,11 +195,12 @@ def main():
         upload_button = st.button('Upload')
 
         if upload_button:
-            if upload_url.strip() and upload_collection_name.strip():
+            urls = [url.strip() for url in upload_urls.splitlines() if url.strip()]
+            if urls and upload_collection_name.strip():
                 # TODO: Add logic to verify unique collection names in the database
                 with st.spinner('🔄 Uploading data to Qdrant...'):
                     response = upload_documents(
-                        url=upload_url,
+                        urls=urls,
                         collection_name=upload_collection_name
                     )
 
@@ -167,7 +211,7 @@ def main():
                         st.subheader('Response:')
                         st.json(response)
             else:
-                st.warning('Please enter both a URL and collection name to continue.')
+                st.warning('Please enter at least one URL and a collection name to continue.')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file